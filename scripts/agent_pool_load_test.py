@@ -0,0 +1,79 @@
+import os, sys, time, subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from stub_llm_server import start_stub_llm
+
+# Load test for the ai-analyst worker pool.
+# Boots the analyst against a local stub LLM once per pool size, fires a burst of
+# concurrent /analyze requests and reports throughput + pool wait times.
+#
+#   python scripts/agent_pool_load_test.py [requests] [latency_ms] [pool sizes...]
+#   python scripts/agent_pool_load_test.py 16 300 1 2 4 8
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANALYST_DIR = os.path.join(ROOT, "services", "ai-analyst")
+STUB_PORT = 18080
+ANALYST_PORT = 18001
+
+SAMPLE_INCIDENT = {
+    "hostname": "dxb-sql-prod", "ip_address": "10.0.5.5",
+    "command": "powershell -enc JABzID0gTmV3LU9i...",
+    "criticality": "CRITICAL", "is_business_hours": True
+}
+
+def boot_analyst(pool_size):
+    env = dict(os.environ)
+    env.update({
+        "AGENT_POOL_SIZE": str(pool_size),
+        "GROQ_BASE_URL": f"http://127.0.0.1:{STUB_PORT}",
+        "GROQ_API_KEY": "stub",
+        "PYTHONPATH": os.pathsep.join(filter(None, [ANALYST_DIR, os.path.join(ROOT, "shared"), os.getenv("PYTHONPATH")]))
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", os.path.join(ANALYST_DIR, "src"),
+         "--port", str(ANALYST_PORT), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{ANALYST_PORT}/metrics", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("ai-analyst did not come up")
+
+def fire(_):
+    r = requests.post(f"http://127.0.0.1:{ANALYST_PORT}/analyze", json=SAMPLE_INCIDENT, timeout=300)
+    return r.status_code == 200
+
+def run_round(pool_size, total):
+    proc = boot_analyst(pool_size)
+    try:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=total) as clients:
+            ok = sum(clients.map(fire, range(total)))
+        elapsed = time.monotonic() - start
+        metrics = requests.get(f"http://127.0.0.1:{ANALYST_PORT}/metrics", timeout=5).json()["agent_pool"]
+    finally:
+        proc.terminate()
+        proc.wait()
+    return ok, elapsed, metrics
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+    sizes = [int(s) for s in sys.argv[3:]] or [1, 2, 4, 8]
+
+    stub = start_stub_llm(STUB_PORT, latency_ms=latency)
+    print(f"[*] STUB LLM: {latency}ms per completion | {total} concurrent incidents per round\n")
+    print(f"{'pool':>5} {'ok':>5} {'elapsed_s':>10} {'inc/s':>7} {'wait_p50':>9} {'wait_p99':>9}")
+    try:
+        for size in sizes:
+            ok, elapsed, m = run_round(size, total)
+            wait = m["wait_seconds"]
+            print(f"{size:>5} {ok:>5} {elapsed:>10.2f} {ok / elapsed:>7.2f} "
+                  f"{wait['p50'] or 0:>9.2f} {wait['p99'] or 0:>9.2f}")
+    finally:
+        stub.shutdown()
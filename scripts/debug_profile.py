@@ -0,0 +1,130 @@
+import os, sys, argparse, pstats
+from collections import Counter
+import requests
+from dotenv import load_dotenv
+
+# Fetches and summarizes /debug/* diagnostics from a live soar-bridge or ai-analyst.
+# Requires DEBUG_PROFILING_TOKEN in .env (same value the services were started with).
+#
+#   python scripts/debug_profile.py cpu http://localhost:8000 --seconds 15
+#   python scripts/debug_profile.py cpu http://localhost:8001 --format pstats --out analyst.prof
+#   python scripts/debug_profile.py cpu http://localhost:8001 --thread agent-worker --idle
+#   python scripts/debug_profile.py memory-start http://localhost:8000 --ttl 600
+#   python scripts/debug_profile.py memory http://localhost:8000     (run again later to see growth)
+#   python scripts/debug_profile.py stacks http://localhost:8001
+
+load_dotenv()
+
+def call(base_url, method, path, **kwargs):
+    headers = {"X-Debug-Token": os.getenv("DEBUG_PROFILING_TOKEN", "")}
+    r = requests.request(method, f"{base_url.rstrip('/')}/debug{path}", headers=headers, **kwargs)
+    if r.status_code == 404:
+        sys.exit("[!] Debug endpoints not mounted. Is DEBUG_PROFILING_TOKEN set on the service?")
+    if r.status_code != 200:
+        sys.exit(f"[!] {r.status_code}: {r.text}")
+    return r
+
+def summarize_collapsed(text, top, idle=False):
+    """Self time (leaf frame) and inclusive time per frame from collapsed stacks."""
+    self_hits, total_hits, samples = Counter(), Counter(), 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        stack, hits = line.rsplit(" ", 1)
+        hits = int(hits)
+        frames = stack.split(";")[1:]  # First entry is the thread name
+        if not frames:
+            continue
+        samples += hits
+        self_hits[frames[-1]] += hits
+        for frame in set(frames):
+            total_hits[frame] += hits
+
+    view = "wall-clock, idle threads included" if idle else "busy threads only"
+    print(f"\n[*] {samples} thread-samples ({view})")
+    for title, counter in (("SELF (leaf frame)", self_hits), ("INCLUSIVE (on the stack)", total_hits)):
+        print(f"\n--- TOP {top} {title} ---")
+        for frame, hits in counter.most_common(top):
+            print(f"{100.0 * hits / max(samples, 1):6.1f}%  {frame}")
+
+def cpu(args):
+    print(f"[*] Profiling {args.url} for {args.seconds}s ...")
+    r = call(args.url, "GET", "/profile/cpu",
+             params={"seconds": args.seconds, "interval_ms": args.interval_ms, "format": args.format,
+                     "idle": args.idle, "thread": args.thread},
+             timeout=args.seconds + 30)
+    out = args.out or ("profile.prof" if args.format == "pstats" else "profile.collapsed")
+    with open(out, "wb") as f:
+        f.write(r.content)
+    print(f"[✔] {r.headers.get('X-Profile-Samples')} samples saved to {out} "
+          f"({r.headers.get('X-Profile-Idle-Dropped', 0)} idle thread-samples dropped)")
+
+    if args.format == "pstats":
+        pstats.Stats(out).sort_stats("cumulative").print_stats(args.top)
+    else:
+        summarize_collapsed(r.text, args.top, args.idle)
+
+def memory(args):
+    data = call(args.url, "GET", "/memory", params={"top": args.top}, timeout=60).json()
+    print(f"[*] Traced: {data['traced_bytes'] / 1024:.1f} KiB | Peak: {data['peak_bytes'] / 1024:.1f} KiB"
+          f" | Auto-stop in {data['expires_in_seconds']}s")
+    print(f"\n--- TOP {args.top} ALLOCATION SITES ---")
+    for stat in data["top"]:
+        print(f"{stat['size_bytes'] / 1024:10.1f} KiB  {stat['count']:>8}  {stat['location']}")
+    if data.get("growth"):
+        print("\n--- GROWTH SINCE LAST SNAPSHOT ---")
+        for diff in data["growth"]:
+            print(f"{diff['size_diff_bytes'] / 1024:+10.1f} KiB  {diff['count_diff']:>+8}  {diff['location']}")
+
+def memory_start(args):
+    data = call(args.url, "POST", "/memory/start", params={"ttl_seconds": args.ttl}, timeout=30).json()
+    print(f"[*] {data['status']}, auto-stop in {data['expires_in_seconds']}s. "
+          f"Run 'memory' later to see allocation growth.")
+
+def memory_stop(args):
+    print(f"[*] {call(args.url, 'POST', '/memory/stop', timeout=10).json()['status']}")
+
+def stacks(args):
+    data = call(args.url, "GET", "/stacks", timeout=10).json()
+    for thread in data["threads"]:
+        print(f"\n=== THREAD {thread['thread']} ({thread['ident']}) ===")
+        print("\n".join(thread["stack"]))
+    for task in data["asyncio_tasks"]:
+        print(f"\n=== TASK {task['task']} [{task['coro']}] done={task['done']} ===")
+        print("\n".join(task["stack"]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NeoGrid live service diagnostics")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("cpu", help="Sampling profile of busy thread stacks")
+    p.add_argument("url")
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--interval-ms", type=float, default=5)
+    p.add_argument("--format", choices=["collapsed", "pstats"], default="collapsed")
+    p.add_argument("--out")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--idle", action="store_true", help="Keep threads parked in blocking waits (wall-clock view)")
+    p.add_argument("--thread", help="Only sample threads whose name contains this")
+    p.set_defaults(handler=cpu)
+
+    p = sub.add_parser("memory-start", help="Start tracemalloc (stops itself after --ttl seconds)")
+    p.add_argument("url")
+    p.add_argument("--ttl", type=float, default=300)
+    p.set_defaults(handler=memory_start)
+
+    p = sub.add_parser("memory", help="tracemalloc snapshot + diff against the previous one")
+    p.add_argument("url")
+    p.add_argument("--top", type=int, default=20)
+    p.set_defaults(handler=memory)
+
+    p = sub.add_parser("memory-stop", help="Stop tracemalloc (removes its overhead)")
+    p.add_argument("url")
+    p.set_defaults(handler=memory_stop)
+
+    p = sub.add_parser("stacks", help="Dump all thread and asyncio task stacks")
+    p.add_argument("url")
+    p.set_defaults(handler=stacks)
+
+    args = parser.parse_args()
+    args.handler(args)
@@ -0,0 +1,75 @@
+import os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+
+from stub_llm_server import start_stub_llm
+
+# Tail-latency benchmark for the ai-analyst model routing transport.
+# Drives ModelRouterTransport directly against local stub model servers with injected
+# latency and reports client-side p50/p99 with hedging off vs. on, plus a rate-limited
+# primary to exercise the fallback model.
+#
+#   python scripts/llm_hedging_benchmark.py [calls] [concurrency]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "ai-analyst", "src"))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+from latency_stats import percentile
+from model_router import ModelRouterTransport
+
+PRIMARY = "llama-3.3-70b-versatile"
+FALLBACK = "llama-3.1-8b-instant"
+WARMUP_CALLS = 40  # Fills the latency window the hedge trigger is computed from
+
+def run_scenario(port, calls, concurrency, **router_kwargs):
+    transport = ModelRouterTransport(call_timeout=10, **router_kwargs)
+    client = httpx.Client(transport=transport, timeout=None)
+    url = f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+    payload = {"model": PRIMARY, "messages": [{"role": "user", "content": "Signals: Command whoami /priv"}]}
+
+    def one_call(_):
+        started = time.monotonic()
+        try:
+            ok = client.post(url, json=payload).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        return time.monotonic() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_call, range(WARMUP_CALLS)))
+        results = list(pool.map(one_call, range(calls)))
+    stats = transport.snapshot()
+    client.close()
+
+    latencies = [latency for latency, _ in results]
+    return {
+        "ok": sum(1 for _, ok in results if ok),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        **stats
+    }
+
+def report(label, result, calls):
+    print(f"{label:<28} {result['ok']:>4}/{calls:<4} {result['p50']:>7.3f} {result['p99']:>7.3f} {result['max']:>7.3f} "
+          f"{result['hedged']:>6} {result['hedge_wins']:>5} {result['fallbacks']:>9}")
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    # 200ms +/- 50ms typical completion, 5% of calls stall for 2.5s
+    tail_stub = start_stub_llm(18090, latency_ms=200, jitter_ms=50, slow_ratio=0.05, slow_ms=2500)
+    # Same profile, but 30% of primary-model calls are rate-limited
+    limited_stub = start_stub_llm(18091, latency_ms=200, jitter_ms=50, rate_limit_ratio=0.3, rate_limit_model=PRIMARY)
+
+    print(f"[*] {calls} calls per scenario @ concurrency {concurrency} (+{WARMUP_CALLS} warm-up)\n")
+    print(f"{'scenario':<28} {'ok':>9} {'p50_s':>7} {'p99_s':>7} {'max_s':>7} {'hedged':>6} {'wins':>5} {'fallbacks':>9}")
+    try:
+        report("tail stalls, hedging OFF", run_scenario(18090, calls, concurrency, hedging=False), calls)
+        report("tail stalls, hedging ON", run_scenario(18090, calls, concurrency, hedging=True), calls)
+        report("429s, no fallback", run_scenario(18091, calls, concurrency, hedging=True), calls)
+        report("429s, fallback model", run_scenario(18091, calls, concurrency, hedging=True, fallback_model=FALLBACK), calls)
+    finally:
+        tail_stub.shutdown()
+        limited_stub.shutdown()
@@ -0,0 +1,88 @@
+import json, sys, time, random, threading, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Groq (OpenAI-compatible) chat completion API.
+# Point the ai-analyst at it with: GROQ_BASE_URL=http://127.0.0.1:<port> GROQ_API_KEY=stub
+# Every completion is delayed by latency_ms (+/- jitter_ms) to emulate model think time.
+# Tail injection: slow_ratio of calls take slow_ms instead (stalls / long completions).
+# Rate limiting: rate_limit_ratio of calls for rate_limit_model get a 429.
+
+STUB_VERDICT = (
+    "[DECISION] | SUSPICIOUS\n"
+    "h2. TECHNICAL ANALYSIS\nStub model response.\n"
+    "h2. CONTEXT AUDIT\nStub model response.\n"
+    "h2. MITRE ATT&CK\nT0000 - Stub.\n"
+    "h2. RECOMMENDED REMEDIATION\nNone (load test)."
+)
+
+def make_handler(latency_ms, jitter_ms, slow_ratio=0.0, slow_ms=0.0, rate_limit_ratio=0.0, rate_limit_model=None):
+    class StubCompletionHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            model = body.get("model", "stub")
+            if rate_limit_ratio and model == rate_limit_model and random.random() < rate_limit_ratio:
+                payload = json.dumps({"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}}).encode()
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            if slow_ratio and random.random() < slow_ratio:
+                delay = slow_ms / 1000.0
+            else:
+                delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+            time.sleep(delay)
+
+            payload = json.dumps({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": STUB_VERDICT},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            }).encode()
+
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client gave up (hedge loser or deadline)
+
+        def log_message(self, *args):
+            pass  # Keep load-test output readable
+
+    return StubCompletionHandler
+
+def start_stub_llm(port, latency_ms=300, jitter_ms=0, **faults):
+    """Starts the stub in a daemon thread and returns the server (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, jitter_ms, **faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    # python scripts/stub_llm_server.py [port] [latency_ms] [jitter_ms] [slow_ratio] [slow_ms]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 18080
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+    jitter = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    slow_ratio = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    slow_ms = float(sys.argv[5]) if len(sys.argv) > 5 else 0
+    print(f"[*] STUB LLM listening on 127.0.0.1:{port} ({latency}ms +/- {jitter}ms, {slow_ratio:.0%} at {slow_ms}ms)")
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, jitter, slow_ratio, slow_ms))
+    server.serve_forever()
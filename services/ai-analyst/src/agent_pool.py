@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from latency_stats import percentile
+
+class AgentWorkerPool:
+    """
+    Bounded thread pool for synchronous agent investigations.
+    At most `size` investigations hit the LLM provider at once; the rest wait in
+    the executor queue, which is what queue_depth and wait_seconds report.
+    """
+    def __init__(self, size, sample_window=1000):
+        self.size = max(1, int(size))
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="agent-worker")
+
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.counters = {"completed": 0, "failed": 0, "cancelled": 0}
+        self._waits = deque(maxlen=sample_window)
+        self._runs = deque(maxlen=sample_window)
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on a worker thread and awaits the result without blocking the loop."""
+        submitted = time.monotonic()
+        with self._lock:
+            self.queued += 1
+        future = self._executor.submit(self._execute, submitted, fn, args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Client went away before a worker picked the job up
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+                    self.counters["cancelled"] += 1
+            raise
+
+    def _execute(self, submitted, fn, args):
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._waits.append(started - submitted)
+        outcome = "failed"
+        try:
+            result = fn(*args)
+            outcome = "completed"
+            return result
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.counters[outcome] += 1
+                self._runs.append(time.monotonic() - started)
+
+    def snapshot(self):
+        with self._lock:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            stats = {
+                "size": self.size,
+                "active": self.active,
+                "queue_depth": self.queued,
+                **self.counters
+            }
+        stats["wait_seconds"] = {"p50": percentile(waits, 50), "p90": percentile(waits, 90), "p99": percentile(waits, 99)}
+        stats["run_seconds"] = {"p50": percentile(runs, 50), "p90": percentile(runs, 90), "p99": percentile(runs, 99)}
+        return stats
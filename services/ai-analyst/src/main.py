@@ -1,13 +1,20 @@
 import os
 import sys
+import time
+import httpx
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.groq import Groq
+from agno.run import RunStatus
 
 # 1. PATH FIX FOR TOOLS
 sys.path.append('/app') 
 from tools.intel_tools import check_ip_reputation, check_file_hash, get_mitre_context
+from specialist_router import SpecialistRouter
+from agent_pool import AgentWorkerPool
+from model_router import ModelRouterTransport, deadline_scope
+from debug_profiler import install_debug_routes
 
 load_dotenv()
 
@@ -24,81 +31,203 @@ def get_security_policy():
 
 POLICY_TEXT = get_security_policy()
 
+# Criticality values whose hosts never need external reputation lookups (e.g. "LAB,SANDBOX")
+router = SpecialistRouter(os.getenv("ROUTER_BENIGN_ASSET_CLASSES", "LAB,SANDBOX").split(","))
+
 # --- 🚀 TEAM DEFINITION: SPECIALIZED AGENTS ---
+# Agents carry per-run state (messages, tool calls), so every investigation builds
+# its own team instead of sharing module-level singletons across concurrent requests.
+
+PRIMARY_MODEL_ID = os.getenv("LLM_PRIMARY_MODEL", "llama-3.3-70b-versatile")
+FALLBACK_MODEL_ID = os.getenv("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant")
+
+# --- 🔀 MODEL ROUTING ---
+# Every completion goes through a routing transport: hedges slow calls past the adaptive
+# latency percentile and bounds each call by the investigation's remaining budget.
+# Specialists may fall back to the faster model when the primary is rate-limited;
+# the Lead Analyst's verdict always comes from the primary.
+router_settings = {
+    "hedging": os.getenv("LLM_HEDGING", "on").lower() not in ("0", "off", "false"),
+    "hedge_percentile": float(os.getenv("LLM_HEDGE_PERCENTILE", "90")),
+    "call_timeout": float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "25"))
+}
+specialist_transport = ModelRouterTransport(fallback_model=FALLBACK_MODEL_ID, **router_settings)
+lead_transport = ModelRouterTransport(**router_settings)
+specialist_http = httpx.Client(transport=specialist_transport, timeout=None)
+lead_http = httpx.Client(transport=lead_transport, timeout=None)
+
+# Budget when the caller does not send one, and the slice kept back for the Lead Analyst
+DEFAULT_BUDGET_SECONDS = float(os.getenv("ANALYZE_BUDGET_SECONDS", "55"))
+LEAD_RESERVE_SECONDS = float(os.getenv("LEAD_ANALYST_RESERVE_SECONDS", "15"))
 
-shared_model = Groq(id="llama-3.3-70b-versatile")
+def build_model(http_client):
+    # max_retries=0: rate limits are handled by the routing fallback, not SDK backoff
+    return Groq(id=PRIMARY_MODEL_ID, http_client=http_client, max_retries=0)
 
 # 🕵️ Specialist 1: Threat Intelligence Specialist
-intel_specialist = Agent(
-    name="Threat Intel Specialist",
-    role="Reputation Analysis Auditor",
-    model=shared_model,
-    tools=[check_ip_reputation, check_file_hash],
-    instructions=[
-        "Identify reputation data only.",
-        "IF THE IP IS PRIVATE, respond with: 'Internal Network Asset. Tool lookup bypassed.'",
-        "Otherwise, summarize global reputation scores and engine hits."
-    ]
-)
+# Only offered the tools the router found indicators for
+def build_intel_specialist(model, use_ip_reputation=True, use_file_hash=True):
+    tools = []
+    if use_ip_reputation:
+        tools.append(check_ip_reputation)
+    if use_file_hash:
+        tools.append(check_file_hash)
+    return Agent(
+        name="Threat Intel Specialist",
+        role="Reputation Analysis Auditor",
+        model=model,
+        tools=tools,
+        instructions=[
+            "Identify reputation data only.",
+            "Look up every listed lookup target and file hash with your tools. Do not look up IPs marked (internal).",
+            "Summarize global reputation, geolocation and engine hits per indicator."
+        ]
+    )
 
 # 🛠️ Specialist 2: Detection Engineer
-detection_specialist = Agent(
-    name="Detection Specialist",
-    role="MITRE ATT&CK Mapping expert",
-    model=shared_model,
-    tools=[get_mitre_context],
-    instructions=[
-        "Focus strictly on the behavior of the 'Command'.",
-        "Map it to a MITRE Technique using tools or your internal logic.",
-        "Provide T-code evidence. Be concise."
-    ]
-)
+def build_detection_specialist(model):
+    return Agent(
+        name="Detection Specialist",
+        role="MITRE ATT&CK Mapping expert",
+        model=model,
+        tools=[get_mitre_context],
+        instructions=[
+            "Focus strictly on the behavior of the 'Command'.",
+            "Map it to a MITRE Technique using tools or your internal logic.",
+            "Provide T-code evidence. Be concise."
+        ]
+    )
 
 # 🏢 Specialist 3: Compliance & Asset Specialist
-compliance_specialist = Agent(
-    name="Compliance Agent",
-    role="Internal Corporate Governance expert",
-    model=shared_model,
-    instructions=[
-        "Evaluate signals against Corporate Policy.",
-        f"POLICY SOURCE: {POLICY_TEXT}",
-        "CRITICAL: If the activity (like Scenario 2 Backup) matches SECTION 1 precisely, tag it as 'MATCHED EXCEPTION'.",
-        "Check business hours logic and asset criticality."
-    ]
-)
+def build_compliance_specialist(model):
+    return Agent(
+        name="Compliance Agent",
+        role="Internal Corporate Governance expert",
+        model=model,
+        instructions=[
+            "Evaluate signals against Corporate Policy.",
+            f"POLICY SOURCE: {POLICY_TEXT}",
+            "CRITICAL: If the activity (like Scenario 2 Backup) matches SECTION 1 precisely, tag it as 'MATCHED EXCEPTION'.",
+            "Check business hours logic and asset criticality."
+        ]
+    )
 
 # --- 🧠 LEAD ANALYST: THE "NO-FLUFF" ORCHESTRATOR ---
 
-lead_analyst = Agent(
-    name="Lead SOC Analyst",
-    role="L3 Senior Decision Maker",
-    model=shared_model,
-    instructions=[
-        "You provide the FINAL EXECUTIVE VERDICT. Your goal is SOC efficiency.",
-        
-        "🚨 TRIAGE POLICY 🚨",
-        "If the Compliance Specialist reports a 'MATCHED EXCEPTION' or an approved activity, your decision is AUTHORIZED.",
-        "If the Detection Engineer reports Malicious activity and no exception matches, your decision is MALICIOUS.",
-        
-        "⚠️ OUTPUT RULES (JIRA WIKI FORMAT) ⚠️",
-        "LINE 1: You must output exactly: [DECISION] | AUTHORIZED or [DECISION] | MALICIOUS or [DECISION] | SUSPICIOUS",
-        "DO NOT use # or ## or any markdown headers. DO NOT include introductory chatter.",
-        
-        "FORMATTING STRUCTURE:",
-        "h2. TECHNICAL ANALYSIS",
-        "Detailed synthesis of specialist findings. Use *bold* for emphasis.",
-        "h2. CONTEXT AUDIT",
-        "Audit of Policy windows and Asset role.",
-        "h2. MITRE ATT&CK",
-        "Technique ID and Tactic description.",
-        "h2. RECOMMENDED REMEDIATION",
-        "Required response actions."
-    ],
-    markdown=False
-)
+def build_lead_analyst(model):
+    return Agent(
+        name="Lead SOC Analyst",
+        role="L3 Senior Decision Maker",
+        model=model,
+        instructions=[
+            "You provide the FINAL EXECUTIVE VERDICT. Your goal is SOC efficiency.",
+            
+            "🚨 TRIAGE POLICY 🚨",
+            "If the Compliance Specialist reports a 'MATCHED EXCEPTION' or an approved activity, your decision is AUTHORIZED.",
+            "If the Detection Engineer reports Malicious activity and no exception matches, your decision is MALICIOUS.",
+            
+            "⚠️ OUTPUT RULES (JIRA WIKI FORMAT) ⚠️",
+            "LINE 1: You must output exactly: [DECISION] | AUTHORIZED or [DECISION] | MALICIOUS or [DECISION] | SUSPICIOUS",
+            "DO NOT use # or ## or any markdown headers. DO NOT include introductory chatter.",
+            
+            "FORMATTING STRUCTURE:",
+            "h2. TECHNICAL ANALYSIS",
+            "Detailed synthesis of specialist findings. Use *bold* for emphasis.",
+            "h2. CONTEXT AUDIT",
+            "Audit of Policy windows and Asset role.",
+            "h2. MITRE ATT&CK",
+            "Technique ID and Tactic description.",
+            "h2. RECOMMENDED REMEDIATION",
+            "Required response actions."
+        ],
+        markdown=False
+    )
+
+# --- ⚙️ WORKER POOL ---
+# Agent.run is synchronous; investigations run here so the event loop stays free.
+# Size it to what the LLM provider's rate limit can sustain.
+agent_pool = AgentWorkerPool(int(os.getenv("AGENT_POOL_SIZE", "4")))
+
+class AgentRunError(Exception):
+    pass
+
+def run_agent(agent, prompt):
+    """agno returns model timeouts/provider errors as an ERROR run instead of raising; surface them."""
+    run_output = agent.run(prompt)
+    if run_output.status == RunStatus.error:
+        raise AgentRunError(run_output.content or "Agent run failed")
+    return run_output.content
+
+def consult(agent, prompt):
+    """Runs one agent; a timeout or provider error becomes a finding instead of failing the case."""
+    try:
+        return run_agent(agent, prompt)
+    except Exception as e:
+        print(f"[!] AGENT SWARM: {agent.name} unavailable: {e}")
+        return f"[UNAVAILABLE] {agent.name} did not respond within its deadline ({type(e).__name__}: {e})."
+
+def run_investigation(host, ip, cmd, is_biz, crit, deadline):
+    specialist_model = build_model(specialist_http)
+
+    # Step 1: Route - only invoke specialists that can add information
+    routes = router.plan(ip, cmd, crit)
+
+    # Step 2: Trigger Specialized Analysis (stubbed findings for skipped routes)
+    # Specialists must finish early enough to leave the Lead Analyst its reserve
+    with deadline_scope(deadline - LEAD_RESERVE_SECONDS):
+        intel_route = routes["intel"]
+        if intel_route["run"]:
+            intel_specialist = build_intel_specialist(
+                specialist_model, intel_route["use_ip_reputation"], intel_route["use_file_hash"])
+            intel_finding = consult(intel_specialist, intel_route["prompt"])
+        else:
+            intel_finding = f"[ROUTER] {intel_route['stub']}"
+
+        detection_route = routes["detection"]
+        if detection_route["run"]:
+            detection_finding = consult(build_detection_specialist(specialist_model), detection_route["prompt"])
+        else:
+            detection_finding = f"[ROUTER] {detection_route['stub']}"
+
+        compliance_finding = consult(
+            build_compliance_specialist(specialist_model),
+            f"Context: {host}, Criticality: {crit}, BizHours: {is_biz}, Command: {cmd}"
+        )
+
+    # Step 3: Feed expert data to the Lead Orchestrator
+    orchestration_payload = f"""
+    AUDIT REPORTS:
+    1. INTEL SPECIALIST: {intel_finding}
+    2. DETECTION ENGINEER: {detection_finding}
+    3. COMPLIANCE AGENT: {compliance_finding}
+    
+    METADATA:
+    Host: {host} | CMD: {cmd} | Hours: {is_biz} | TargetIP: {ip}
+    """
+    
+    try:
+        with deadline_scope(deadline):
+            final_response = run_agent(build_lead_analyst(build_model(lead_http)), orchestration_payload)
+        return final_response.strip()
+    except Exception as e:
+        # Still hand the bridge a parseable report so a ticket gets created
+        print(f"[!] AGENT SWARM: Lead Analyst unavailable: {e}")
+        return (
+            "[DECISION] | SUSPICIOUS\n"
+            "h2. TECHNICAL ANALYSIS\n"
+            f"Lead Analyst did not return a verdict within the time budget ({type(e).__name__}: {e}). Manual review required.\n"
+            f"Intel: {intel_finding}\nDetection: {detection_finding}\nCompliance: {compliance_finding}\n"
+            "h2. CONTEXT AUDIT\n"
+            f"Host: {host} | Criticality: {crit} | BizHours: {is_biz}\n"
+            "h2. MITRE ATT&CK\n"
+            "See Detection finding above.\n"
+            "h2. RECOMMENDED REMEDIATION\n"
+            "Analyst to triage manually."
+        )
 
 # --- 🛠️ FASTAPI SERVICE ---
 app = FastAPI(title="NeoGrid AI Agent Swarm Swarm Swarm Swarm Swarm")
+install_debug_routes(app)
 
 @app.post("/analyze")
 async def analyze_incident(data: dict):
@@ -108,26 +237,21 @@ async def analyze_incident(data: dict):
     is_biz = data.get('is_business_hours')
     crit = data.get('criticality')
 
+    # The caller's remaining budget bounds every LLM call, including time spent queued
+    deadline = time.monotonic() + float(data.get('budget_seconds') or DEFAULT_BUDGET_SECONDS)
+
     print(f"[*] AGENT SWARM: Investigating {host} with team...")
 
-    # Step 1: Trigger Specialized Analysis
-    intel_rep = intel_specialist.run(f"Signals: IP {ip}")
-    detection_rep = detection_specialist.run(f"Signals: Command {cmd}")
-    compliance_rep = compliance_specialist.run(f"Context: {host}, Criticality: {crit}, BizHours: {is_biz}, Command: {cmd}")
+    verdict = await agent_pool.run(run_investigation, host, ip, cmd, is_biz, crit, deadline)
+    return {"verdict_report": verdict}
 
-    # Step 2: Feed expert data to the Lead Orchestrator
-    orchestration_payload = f"""
-    AUDIT REPORTS:
-    1. INTEL SPECIALIST: {intel_rep.content}
-    2. DETECTION ENGINEER: {detection_rep.content}
-    3. COMPLIANCE AGENT: {compliance_rep.content}
-    
-    METADATA:
-    Host: {host} | CMD: {cmd} | Hours: {is_biz} | TargetIP: {ip}
-    """
-    
-    final_response = lead_analyst.run(orchestration_payload)
-    return {"verdict_report": final_response.content.strip()}
+@app.get("/metrics")
+async def swarm_metrics():
+    return {
+        "routing": router.snapshot(),
+        "agent_pool": agent_pool.snapshot(),
+        "model_router": {"specialists": specialist_transport.snapshot(), "lead": lead_transport.snapshot()}
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import httpx
+
+from latency_stats import percentile
+
+# Absolute time.monotonic() deadline for LLM calls made from the current investigation
+_call_deadline = contextvars.ContextVar("llm_call_deadline", default=None)
+
+class DeadlineExceeded(httpx.ReadTimeout):
+    """Raised by the router itself when a call runs out of budget (counted as deadline_exceeded)."""
+
+@contextmanager
+def deadline_scope(deadline):
+    """Bounds every LLM call inside the block by `deadline` (nested scopes can only tighten it)."""
+    current = _call_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _call_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _call_deadline.reset(token)
+
+class ModelRouterTransport(httpx.BaseTransport):
+    """
+    httpx transport that sits under the Groq client used by the agents.
+    - Hedging: if a completion has not returned by the adaptive latency percentile,
+      a duplicate is sent and whichever answers first wins (capped by max_hedge_ratio).
+    - Fallback: a 429 from the primary model is retried once on fallback_model.
+    - Deadlines: each call is bounded by min(call_timeout, remaining investigation budget).
+    """
+    def __init__(self, fallback_model=None, hedging=True, hedge_percentile=90, min_samples=20,
+                 max_hedge_ratio=0.15, call_timeout=25, max_workers=32, sample_window=500, inner=None):
+        self.inner = inner or httpx.HTTPTransport()
+        self.fallback_model = fallback_model
+        self.hedging = hedging
+        self.hedge_percentile = float(hedge_percentile)
+        self.min_samples = int(min_samples)
+        self.max_hedge_ratio = float(max_hedge_ratio)
+        self.call_timeout = float(call_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+
+        self._lock = threading.Lock()
+        self._attempt_latencies = deque(maxlen=sample_window)  # Single 200 attempts: drives the hedge trigger
+        self._call_latencies = deque(maxlen=sample_window)     # What the agent actually waited
+        self.counters = {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0,
+            "deadline_exceeded": 0, "errors": 0
+        }
+
+    def handle_request(self, request):
+        started = time.monotonic()
+        call_deadline = started + self.call_timeout
+        budget_deadline = _call_deadline.get()
+        if budget_deadline is not None:
+            call_deadline = min(call_deadline, budget_deadline)
+
+        with self._lock:
+            self.counters["calls"] += 1
+        try:
+            if call_deadline <= started:
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded("Investigation budget exhausted before LLM call", request=request)
+
+            body = request.read()
+            response = self._hedged_send(request, body, call_deadline)
+
+            if response.status_code == 429 and self.fallback_model:
+                fallback_body = self._swap_model(body)
+                if fallback_body is not None:
+                    response.close()
+                    self._count("fallbacks")
+                    print(f"[~] MODEL ROUTER: Primary rate-limited, falling back to {self.fallback_model}")
+                    response = self._hedged_send(request, fallback_body, call_deadline)
+            return response
+        except DeadlineExceeded:
+            raise  # Already counted as deadline_exceeded
+        except httpx.HTTPError:
+            self._count("errors")
+            raise
+        finally:
+            with self._lock:
+                self._call_latencies.append(time.monotonic() - started)
+
+    def _hedged_send(self, request, body, call_deadline):
+        started = time.monotonic()
+        hedge_delay = self._hedge_delay()
+        pending = {self._executor.submit(self._send_once, self._build_request(request, body, call_deadline))}
+        hedge_future = None
+        held, errors = None, []
+
+        try:
+            while pending:
+                remaining = call_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = remaining
+                if hedge_delay is not None and hedge_future is None:
+                    timeout = min(timeout, max(0.0, started + hedge_delay - time.monotonic()))
+
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                        continue
+                    response = future.result()
+                    if response.status_code == 200:
+                        if future is hedge_future:
+                            self._count("hedge_wins")
+                        if held is not None:
+                            held.close()
+                        for other in done:
+                            if other is not future:
+                                _close_result(other)
+                        return response
+                    # Keep a non-200 answer in case nothing better arrives
+                    if held is not None:
+                        held.close()
+                    held = response
+
+                if not done and hedge_delay is not None and hedge_future is None and pending:
+                    if self._may_hedge():
+                        self._count("hedged")
+                        hedge_future = self._executor.submit(
+                            self._send_once, self._build_request(request, body, call_deadline))
+                        pending.add(hedge_future)
+                    else:
+                        hedge_delay = None
+        finally:
+            # Losers still in flight are closed whenever they land
+            for future in pending:
+                future.add_done_callback(_close_result)
+
+        if held is not None:
+            return held
+        if errors:
+            raise errors[-1]
+        self._count("deadline_exceeded")
+        raise DeadlineExceeded("LLM call exceeded its deadline", request=request)
+
+    def _send_once(self, request):
+        started = time.monotonic()
+        response = self.inner.handle_request(request)
+        try:
+            response.read()
+        except Exception:
+            response.close()
+            raise
+        if response.status_code == 200:
+            with self._lock:
+                self._attempt_latencies.append(time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _build_request(request, body, call_deadline):
+        timeout = max(0.001, call_deadline - time.monotonic())
+        headers = [(k, v) for k, v in request.headers.raw if k.lower() != b"content-length"]
+        extensions = dict(request.extensions)
+        extensions["timeout"] = {"connect": timeout, "read": timeout, "write": timeout, "pool": timeout}
+        return httpx.Request(request.method, request.url, headers=headers, content=body, extensions=extensions)
+
+    def _swap_model(self, body):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict) or payload.get("model") == self.fallback_model:
+            return None
+        payload["model"] = self.fallback_model
+        return json.dumps(payload).encode()
+
+    def _hedge_delay(self):
+        if not self.hedging:
+            return None
+        with self._lock:
+            samples = list(self._attempt_latencies)
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, self.hedge_percentile)
+
+    def _may_hedge(self):
+        with self._lock:
+            return self.counters["hedged"] < self.max_hedge_ratio * self.counters["calls"]
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.inner.close()
+
+    def snapshot(self):
+        with self._lock:
+            calls = list(self._call_latencies)
+            stats = {"hedging": self.hedging, "fallback_model": self.fallback_model, **self.counters}
+        stats["hedge_delay_seconds"] = self._hedge_delay()
+        stats["call_latency_seconds"] = {"p50": percentile(calls, 50), "p99": percentile(calls, 99)}
+        return stats
+
+def _close_result(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
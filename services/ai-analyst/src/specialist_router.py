@@ -0,0 +1,122 @@
+import ipaddress
+import re
+import threading
+from urllib.parse import urlparse
+
+from privacy_engine import INTERNAL_NET_MARKER
+
+# Indicators the Intel Specialist's tools can actually do something with
+HASH_PATTERN = re.compile(r'\b(?:[a-fA-F0-9]{64}|[a-fA-F0-9]{40}|[a-fA-F0-9]{32})\b')
+URL_PATTERN = re.compile(r'\b(?:https?|ftp)://[^\s\'"<>|]+', re.IGNORECASE)
+
+INTERNAL_ASSET_STUB = "Internal Network Asset. Tool lookup bypassed."
+NO_INDICATORS_STUB = "No external indicators (public IP, URL or file hash) to look up. Reputation lookup not required."
+
+def is_external_address(value):
+    """True for globally routable IPs. Private/reserved/loopback/link-local are internal."""
+    try:
+        return ipaddress.ip_address(str(value).strip()).is_global
+    except ValueError:
+        return False
+
+class SpecialistRouter:
+    """
+    Deterministic pre-flight over the /analyze inputs. Decides which specialists can
+    add information and produces stub findings for the rest, so the Lead Analyst
+    still receives a complete set of audit reports without the wasted LLM round-trips.
+    """
+    SPECIALISTS = ("intel", "detection", "compliance")
+
+    def __init__(self, benign_asset_classes=()):
+        self.benign_asset_classes = {c.strip().upper() for c in benign_asset_classes if c.strip()}
+        self._lock = threading.Lock()
+        self.route_counts = {name: {"invoked": 0, "stubbed": 0} for name in self.SPECIALISTS}
+        self.llm_calls_saved = 0
+
+    def extract_indicators(self, ip, command):
+        command = command or ""
+        hashes = list(dict.fromkeys(HASH_PATTERN.findall(command)))
+        urls = list(dict.fromkeys(URL_PATTERN.findall(command)))
+
+        lookup_targets = []
+        if ip and is_external_address(ip):
+            lookup_targets.append(ip)
+        for url in urls:
+            host = urlparse(url).hostname
+            if not host or host.upper().startswith(INTERNAL_NET_MARKER):
+                # Redacted by the bridge's PrivacyEngine: an IP literal, nothing to look up
+                continue
+            if _is_ip_literal(host):
+                if is_external_address(host):
+                    lookup_targets.append(host)
+            elif "." in host and host != "localhost":
+                lookup_targets.append(host)
+
+        return {"hashes": hashes, "urls": urls, "lookup_targets": list(dict.fromkeys(lookup_targets))}
+
+    def plan(self, ip, command, criticality):
+        """
+        Returns {specialist: {"run": bool, "prompt"|"stub": str, ...}}.
+        The intel route also lists which tools are worth offering.
+        """
+        indicators = self.extract_indicators(ip, command)
+        routes = {}
+
+        # 1. Threat Intel: only when there is something to look up
+        if indicators["lookup_targets"] or indicators["hashes"]:
+            signals = []
+            if ip and _is_ip_literal(str(ip).strip()):
+                signals.append(f"IP {ip}" + ("" if is_external_address(ip) else " (internal)"))
+            if indicators["lookup_targets"]:
+                signals.append(f"Lookup targets: {', '.join(indicators['lookup_targets'])}")
+            if indicators["hashes"]:
+                signals.append(f"File hashes: {', '.join(indicators['hashes'])}")
+            routes["intel"] = {
+                "run": True,
+                "prompt": "Signals: " + " | ".join(signals),
+                "use_ip_reputation": bool(indicators["lookup_targets"]),
+                "use_file_hash": bool(indicators["hashes"])
+            }
+        elif str(criticality).upper() in self.benign_asset_classes:
+            # Asset class only waives the lookup when there are no external indicators
+            routes["intel"] = {"run": False, "stub": f"Known-benign asset class ({criticality}). Reputation lookup not required."}
+        elif ip and _is_ip_literal(str(ip).strip()):
+            routes["intel"] = {"run": False, "stub": INTERNAL_ASSET_STUB}
+        else:
+            routes["intel"] = {"run": False, "stub": NO_INDICATORS_STUB}
+
+        # 2. Detection: the command is the primary behavioural signal
+        if (command or "").strip():
+            routes["detection"] = {"run": True, "prompt": f"Signals: Command {command}"}
+        else:
+            routes["detection"] = {"run": False, "stub": "No command telemetry supplied. No technique mapping possible."}
+
+        # 3. Compliance: policy exceptions decide AUTHORIZED, so it always runs
+        routes["compliance"] = {"run": True}
+
+        self._record(routes)
+        return routes
+
+    def _record(self, routes):
+        with self._lock:
+            for name, route in routes.items():
+                if route["run"]:
+                    self.route_counts[name]["invoked"] += 1
+                else:
+                    self.route_counts[name]["stubbed"] += 1
+                    self.llm_calls_saved += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "routes": {name: dict(counts) for name, counts in self.route_counts.items()},
+                # Lower bound: a skipped tool-using specialist would have cost >= 1 completion
+                "llm_calls_saved": self.llm_calls_saved
+            }
+
+def _is_ip_literal(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
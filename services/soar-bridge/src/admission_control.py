@@ -0,0 +1,193 @@
+import threading
+import time
+import datetime
+
+FULL = "FULL"
+DEGRADED = "DEGRADED"
+REJECT = "REJECT"
+
+class AdmissionController:
+    """
+    Load-aware gatekeeper for the /alert pipeline.
+    Counts admitted triage work (queued + running) and decides per alert whether it
+    gets the full AI path, the cheap degraded path, or a 429.
+    """
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.soft_limit = int(settings.get('soft_limit', 8))
+        self.hard_limit = int(settings.get('hard_limit', 24))
+        self.retry_after = int(settings.get('retry_after_seconds', 30))
+        self.degradable_severities = {s.upper() for s in settings.get('degradable_severities', ["Info", "Low"])}
+        self.degradable_criticality = {c.upper() for c in settings.get('degradable_criticality', ["LOW", "Standard"])}
+
+        self._lock = threading.Lock()
+        self.pending = 0    # Admitted and not yet finished
+        self.in_flight = 0  # Currently executing on a worker thread
+        self.counters = {"admitted": 0, "degraded": 0, "shed": 0, "protected": 0}
+
+    @staticmethod
+    def is_protected(severity, criticality):
+        """High severity on a CRITICAL asset is never shed or degraded."""
+        return str(severity).upper() == "HIGH" and str(criticality).upper() == "CRITICAL"
+
+    def admit(self, severity, criticality_lookup):
+        """
+        Returns FULL, DEGRADED or REJECT. criticality_lookup is only called once the
+        soft limit is crossed so an idle bridge pays nothing for the decision.
+        A non-REJECT decision must be paired with release().
+        """
+        with self._lock:
+            load = self.pending
+
+        if load < self.soft_limit:
+            decision = FULL
+        else:
+            criticality = criticality_lookup()
+            if self.is_protected(severity, criticality):
+                decision = FULL
+                self._count("protected")
+            elif load >= self.hard_limit:
+                decision = REJECT
+            elif (str(severity).upper() in self.degradable_severities
+                  or str(criticality).upper() in self.degradable_criticality):
+                decision = DEGRADED
+            else:
+                decision = FULL
+
+        with self._lock:
+            if decision == REJECT:
+                self.counters["shed"] += 1
+            else:
+                self.pending += 1
+                self.counters["admitted"] += 1
+                if decision == DEGRADED:
+                    self.counters["degraded"] += 1
+        return decision
+
+    def release(self):
+        with self._lock:
+            self.pending = max(0, self.pending - 1)
+
+    def run_admitted(self, fn, *args):
+        """Worker-thread wrapper so queued vs. running work can be told apart."""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": max(0, self.pending - self.in_flight),
+                "soft_limit": self.soft_limit,
+                "hard_limit": self.hard_limit,
+                **self.counters
+            }
+
+
+class DeferredTicketBatch:
+    """
+    Cheap path for degraded alerts: collects them (deduplicated by IP) and files a
+    single summary ticket per batch instead of one AI-backed ticket per alert.
+    A failed flush puts the batch back and retries after max_wait, up to
+    max_flush_attempts per entry and max_pending entries overall.
+    """
+    def __init__(self, flush_handler, batch_size=10, max_wait_seconds=60,
+                 max_flush_attempts=5, max_pending=500):
+        self.flush_handler = flush_handler
+        self.batch_size = int(batch_size)
+        self.max_wait = float(max_wait_seconds)
+        self.max_flush_attempts = int(max_flush_attempts)
+        self.max_pending = int(max_pending)
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._timer = None
+        self._backoff_until = 0.0  # No size-triggered flushes while Jira is failing
+        self.counters = {"deferred": 0, "batches_flushed": 0, "flush_failures": 0, "dropped": 0}
+
+    def add(self, ip, hostname, command, severity):
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry:
+                entry["hits"] += 1
+                entry["last_command"] = command
+            elif len(self._entries) >= self.max_pending:
+                self.counters["dropped"] += 1
+                print(f"[!] Deferred batch full ({self.max_pending} sources); dropping alert from {ip}")
+                return
+            else:
+                self._entries[ip] = {
+                    "ip": ip, "hostname": hostname, "severity": severity,
+                    "last_command": command, "hits": 1, "flush_attempts": 0,
+                    "first_seen": str(datetime.datetime.now())
+                }
+            self.counters["deferred"] += 1
+            should_flush = (len(self._entries) >= self.batch_size
+                            and time.monotonic() >= self._backoff_until)
+            if not should_flush:
+                self._arm_timer()
+
+        if should_flush:
+            self.flush()
+
+    def _arm_timer(self):
+        # Caller holds self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch = list(self._entries.values())
+            self._entries = {}
+
+        if not batch:
+            return
+        try:
+            self.flush_handler(batch)
+            with self._lock:
+                self.counters["batches_flushed"] += 1
+                self._backoff_until = 0.0
+        except Exception as e:
+            print(f"[!] Deferred batch flush failed ({len(batch)} alerts): {e}")
+            self._requeue(batch)
+
+    def _requeue(self, batch):
+        with self._lock:
+            self.counters["flush_failures"] += 1
+            for entry in batch:
+                entry["flush_attempts"] += 1
+                if entry["flush_attempts"] >= self.max_flush_attempts:
+                    self.counters["dropped"] += 1
+                    print(f"[!] Deferred alert from {entry['ip']} dropped after {entry['flush_attempts']} failed flushes")
+                    continue
+                newer = self._entries.get(entry["ip"])
+                if newer:
+                    # Same source re-deferred while the flush was running: fold the two together
+                    newer["hits"] += entry["hits"]
+                    newer["first_seen"] = entry["first_seen"]
+                    newer["flush_attempts"] = max(newer["flush_attempts"], entry["flush_attempts"])
+                elif len(self._entries) < self.max_pending:
+                    self._entries[entry["ip"]] = entry
+                else:
+                    self.counters["dropped"] += 1
+            self._backoff_until = time.monotonic() + self.max_wait
+            if self._entries:
+                self._arm_timer()
+
+    def snapshot(self):
+        with self._lock:
+            return {"pending": len(self._entries), **self.counters}
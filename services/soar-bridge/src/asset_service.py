@@ -1,3 +1,5 @@
+import os
+import threading
 import pandas as pd
 from datetime import datetime
 import pytz
@@ -6,16 +8,27 @@ class AssetService:
     def __init__(self, csv_path):
         self.path = csv_path
         self.timezone = pytz.timezone("Asia/Dubai")
+        # Inventory indexed by IP; re-read only when the CSV changes on disk, so lookups
+        # from the /alert handler (admission control) never parse the file on the event loop
+        self._lock = threading.Lock()
+        self._assets = None
+        self._mtime = None
+
+    def _inventory(self):
+        mtime = os.stat(self.path).st_mtime
+        with self._lock:
+            if self._assets is None or mtime != self._mtime:
+                df = pd.read_csv(self.path).drop_duplicates('ip_address')
+                self._assets = df.set_index('ip_address', drop=False).to_dict('index')
+                self._mtime = mtime
+            return self._assets
 
     def get_context(self, ip):
         try:
-            df = pd.read_csv(self.path)
-            asset = df[df['ip_address'] == ip]
-            
-            if asset.empty:
-                return {"criticality": "Standard", "is_business_hours": True, "owner": "Unknown"}
+            asset_data = self._inventory().get(ip)
 
-            asset_data = asset.iloc[0]
+            if asset_data is None:
+                return {"criticality": "Standard", "is_business_hours": True, "owner": "Unknown"}
             
             # Logic to check business hours (e.g., 0800-1800)
             now = datetime.now(self.timezone).hour
@@ -0,0 +1,156 @@
+import threading
+import queue
+import time
+from collections import deque
+import requests
+
+from latency_stats import percentile
+
+class ContainmentDispatcher:
+    """
+    Active-defense dispatcher between the triage pipeline and the EDR agent.
+    - Hosts already contained (within the TTL) are skipped.
+    - Requests arriving within the coalesce window are sent as one bulk /block call.
+    - Failed calls are retried with backoff, bounded by a per-batch deadline.
+    """
+    def __init__(self, bulk_endpoint, settings=None):
+        settings = settings or {}
+        self.bulk_endpoint = bulk_endpoint
+        self.coalesce_window = float(settings.get('coalesce_window_seconds', 0.25))
+        self.max_batch = int(settings.get('max_batch_size', 50))
+        self.max_attempts = int(settings.get('max_attempts', 3))
+        self.request_timeout = float(settings.get('request_timeout_seconds', 5))
+        self.backoff = float(settings.get('retry_backoff_seconds', 0.5))
+        self.max_dispatch = float(settings.get('max_dispatch_seconds', 10))
+        self.isolation_ttl = float(settings.get('isolation_ttl_seconds', 3600))
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._isolated = {}   # ip -> monotonic time the agent confirmed isolation (oldest first)
+        self._pending = {}    # ip -> monotonic time isolation was first requested
+        self._latencies = deque(maxlen=int(settings.get('latency_window', 1000)))
+        self.counters = {
+            "requested": 0, "skipped_contained": 0, "coalesced": 0,
+            "batches": 0, "isolated": 0, "failed": 0, "retries": 0
+        }
+
+        self._worker = threading.Thread(target=self._run, name="containment-dispatcher", daemon=True)
+        self._worker.start()
+
+    def isolate(self, ip):
+        """Non-blocking. Returns ALREADY_CONTAINED, PENDING (coalesced) or QUEUED."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune_isolated(now)
+            contained_at = self._isolated.get(ip)
+            if contained_at is not None and now - contained_at < self.isolation_ttl:
+                self.counters["skipped_contained"] += 1
+                return "ALREADY_CONTAINED"
+            if ip in self._pending:
+                self.counters["coalesced"] += 1
+                return "PENDING"
+            self._pending[ip] = now
+            self.counters["requested"] += 1
+        self._queue.put(ip)
+        return "QUEUED"
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            window_end = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                print(f"[!] CONTAINMENT: Dispatcher error: {e}")
+                # Only fail what _dispatch had not already settled
+                with self._lock:
+                    unsettled = [ip for ip in batch if ip in self._pending]
+                self._settle([], unsettled)
+
+    def _dispatch(self, batch):
+        with self._lock:
+            self.counters["batches"] += 1
+        print(f"[🛡️] CONTAINMENT: Dispatching bulk isolation for {len(batch)} host(s): {', '.join(batch)}")
+
+        deadline = time.monotonic() + self.max_dispatch
+        outstanding = list(batch)
+        for attempt in range(1, self.max_attempts + 1):
+            budget = deadline - time.monotonic()
+            if budget <= 0:
+                break
+            try:
+                r = requests.post(self.bulk_endpoint, json={"ips": outstanding},
+                                  timeout=min(self.request_timeout, budget))
+                if r.status_code == 200:
+                    payload = r.json()
+                    results = payload.get("results", {}) if isinstance(payload, dict) else {}
+                    confirmed = [ip for ip in outstanding if results.get(ip) == "ISOLATION_APPLIED"]
+                    self._settle(confirmed, [])
+                    outstanding = [ip for ip in outstanding if ip not in confirmed]
+                else:
+                    print(f"[!] CONTAINMENT: Agent returned {r.status_code} (attempt {attempt})")
+            except requests.RequestException as e:
+                print(f"[!] CONTAINMENT: Agent unreachable (attempt {attempt}): {e}")
+            except ValueError as e:
+                print(f"[!] CONTAINMENT: Agent returned an unreadable body (attempt {attempt}): {e}")
+
+            if not outstanding or attempt == self.max_attempts:
+                break
+            pause = min(self.backoff * (2 ** (attempt - 1)), deadline - time.monotonic())
+            if pause <= 0:
+                break
+            with self._lock:
+                self.counters["retries"] += 1
+            time.sleep(pause)
+
+        if outstanding:
+            print(f"[!] CONTAINMENT: Isolation FAILED for {', '.join(outstanding)}")
+            self._settle([], outstanding)
+
+    def _settle(self, confirmed, failed):
+        now = time.monotonic()
+        with self._lock:
+            self._prune_isolated(now)
+            for ip in confirmed:
+                requested_at = self._pending.pop(ip, now)
+                self._isolated.pop(ip, None)  # Re-insert so the dict stays ordered by time
+                self._isolated[ip] = now
+                self._latencies.append(now - requested_at)
+                self.counters["isolated"] += 1
+            for ip in failed:
+                # Dropped from pending so the next malicious verdict retries it
+                self._pending.pop(ip, None)
+                self.counters["failed"] += 1
+
+    def _prune_isolated(self, now):
+        # Caller holds self._lock. Insertion order is confirmation order, so expired hosts are at the front
+        while self._isolated:
+            ip, contained_at = next(iter(self._isolated.items()))
+            if now - contained_at < self.isolation_ttl:
+                break
+            del self._isolated[ip]
+
+    def snapshot(self):
+        with self._lock:
+            self._prune_isolated(time.monotonic())
+            samples = list(self._latencies)
+            stats = {
+                "contained_hosts": len(self._isolated),
+                "pending": len(self._pending),
+                **self.counters
+            }
+        stats["time_to_isolate_seconds"] = {
+            "p50": percentile(samples, 50),
+            "p90": percentile(samples, 90),
+            "p99": percentile(samples, 99),
+            "samples": len(samples)
+        }
+        return stats
@@ -7,6 +7,8 @@ print("[*] SYSTEM: Bootstrapping Enterprise SOAR Bridge...")
 
 import requests, base64, datetime, pytz, yaml, re
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -14,6 +16,9 @@ from dotenv import load_dotenv
 from asset_service import AssetService
 from state_manager import StateManager
 from privacy_engine import PrivacyEngine
+from admission_control import AdmissionController, DeferredTicketBatch, DEGRADED, REJECT
+from containment_dispatcher import ContainmentDispatcher
+from debug_profiler import install_debug_routes
 
 print("[*] SYSTEM: Internal Services Layer Online.")
 
@@ -29,19 +34,25 @@ def load_soar_config():
 
 cfg = load_soar_config()
 app = FastAPI(title=f"{cfg['system']['org_name']} Orchestrator")
+install_debug_routes(app)
 
 # Initialize Service Logic
 asset_inventory = AssetService(ASSET_DB_PATH)
 memory = StateManager(STATE_FILE_PATH)
 scrubber = PrivacyEngine()
+admission_cfg = cfg.get('admission_control') or {}
+gatekeeper = AdmissionController(admission_cfg)
 
 # Configuration Constants
 AI_ENDPOINT = cfg['network']['ai_analyst_endpoint']
-AGENT_ENDPOINT = cfg['network']['agent_endpoint']
+AI_TIMEOUT = 60
+AGENT_BULK_ENDPOINT = cfg['network']['agent_bulk_endpoint']
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK_URL")
 ANALYST_ID = os.getenv("JIRA_ANALYST_ID")
 JIRA_ARCHIVE_ID = cfg['jira_settings']['transitions']['archive_id']
 
+containment = ContainmentDispatcher(AGENT_BULK_ENDPOINT, cfg.get('containment'))
+
 class Incident(BaseModel):
     hostname: str
     ip_address: str
@@ -154,22 +165,124 @@ def send_slack_alert(verdict, hostname, priority, ticket_key):
         }, timeout=5)
     except: pass
 
+def file_deferred_batch(batch):
+    """Files one summary ticket for alerts that were triaged on the degraded (no-LLM) path."""
+    lines = ["h2. DEFERRED TRIAGE BATCH",
+             f"{len(batch)} alert source(s) were admitted under load and skipped AI analysis. Review manually."]
+    for entry in batch:
+        lines.append(
+            f"{entry['hostname']} ({entry['ip']}) | Severity: {entry['severity']} | "
+            f"Hits: {entry['hits']} | First seen: {entry['first_seen']} | Last cmd: {entry['last_command']}"
+        )
+
+    jira_key = create_jira_ticket(
+        title=f"[DEFERRED] {len(batch)} low-priority alerts",
+        description="\n".join(lines),
+        priority="Low"
+    )
+    if not jira_key:
+        raise RuntimeError("Jira did not return a ticket key")
+
+    # Later repeats from these sources dedupe onto the batch ticket
+    for entry in batch:
+        memory.update_incident(entry['ip'], jira_key)
+    print(f"[📦] DEFERRED BATCH: {len(batch)} sources filed under {jira_key}")
+
+deferred_tickets = DeferredTicketBatch(
+    file_deferred_batch,
+    batch_size=admission_cfg.get('deferred_batch_size', 10),
+    max_wait_seconds=admission_cfg.get('deferred_max_wait_seconds', 60),
+    max_flush_attempts=admission_cfg.get('deferred_max_flush_attempts', 5),
+    max_pending=admission_cfg.get('deferred_max_pending', 500)
+)
+
 # --- [ CORE SOAR PIPELINE ] ---
 
 @app.post("/alert")
 async def process_pipeline(incident: Incident):
     print(f"\n[*] INGESTING ALERT: {incident.ip_address} | {incident.hostname}")
 
+    # 0. ADMISSION CONTROL
+    # Asset criticality is only resolved once the bridge is past its soft limit
+    mode = gatekeeper.admit(
+        incident.severity,
+        lambda: asset_inventory.get_context(incident.ip_address)['criticality']
+    )
+    if mode == REJECT:
+        print(f"[⛔] LOAD SHED: {incident.ip_address} rejected (triage backlog over hard limit)")
+        return JSONResponse(
+            status_code=429,
+            content={"status": "Shed", "retry_after": gatekeeper.retry_after},
+            headers={"Retry-After": str(gatekeeper.retry_after)}
+        )
+
+    # Blocking I/O (AI, Jira, Slack) runs on the worker pool so the loop keeps admitting
+    pipeline = run_degraded_pipeline if mode == DEGRADED else run_triage_pipeline
+    try:
+        return await run_in_threadpool(gatekeeper.run_admitted, pipeline, incident)
+    finally:
+        gatekeeper.release()
+
+def defer_alert(incident: Incident, command):
+    deferred_tickets.add(
+        incident.ip_address, incident.hostname,
+        scrubber.redact_log(command), incident.severity
+    )
+
+def run_degraded_pipeline(incident: Incident):
+    """Cheap path under load: dedupe + deferred batch ticket, no LLM call."""
+    outcome, existing_ticket, _ = memory.claim(incident.ip_address, incident.command)
+    if outcome == "TICKET":
+        print(f"[!] DEGRADED DEDUPE: Repeat activity on ticket {existing_ticket}")
+        memory.update_incident(incident.ip_address, existing_ticket)
+        return {"status": "Deduplicated", "ticket": existing_ticket, "mode": "Degraded"}
+    if outcome == "IN_FLIGHT":
+        print(f"[!] DEGRADED DEDUPE: {incident.ip_address} already in triage, recorded as repeat")
+        return {"status": "Deduplicated", "ticket": None, "pending": True, "mode": "Degraded"}
+
+    print(f"[⏳] DEGRADED: {incident.ip_address} deferred to batch ticket (AI analysis skipped)")
+    defer_alert(incident, incident.command)
+    # The batch dedupes by IP itself, so repeats caught in this short claim just join it
+    for command in memory.release_claim(incident.ip_address):
+        defer_alert(incident, command)
+    return {"status": "Deferred", "ticket": None, "mode": "Degraded"}
+
+def run_triage_pipeline(incident: Incident):
+
     # 1. STATE MANAGEMENT
-    # Deduplicate repeated signals from the same IP to prevent ticket storms
-    existing_ticket, hit_count = memory.check_duplicate(incident.ip_address)
-    if existing_ticket:
+    # Deduplicate repeated signals from the same IP to prevent ticket storms.
+    # The IP is claimed before the slow work so concurrent repeats cannot open their own case.
+    outcome, existing_ticket, hit_count = memory.claim(incident.ip_address, incident.command)
+    if outcome == "TICKET":
         print(f"[!] DEDUPLICATING: Repeat activity on ticket {existing_ticket}")
         recurring_msg = f"⚠️ RECURRING ACTIVITY detected ({hit_count + 1} hits). Cmd: `{incident.command}`"
         add_jira_comment(existing_ticket, recurring_msg)
         memory.update_incident(incident.ip_address, existing_ticket)
         return {"status": "Deduplicated", "ticket": existing_ticket}
+    if outcome == "IN_FLIGHT":
+        print(f"[!] DEDUPLICATING: {incident.ip_address} already in triage ({hit_count} repeat hits queued)")
+        return {"status": "Deduplicated", "ticket": None, "pending": True}
 
+    result = None
+    try:
+        result = investigate_incident(incident)
+        return result
+    finally:
+        settle_claim(incident, (result or {}).get("ticket"))
+
+def settle_claim(incident: Incident, jira_key):
+    """Releases the IP claim and accounts for repeats that arrived during triage."""
+    repeats = memory.release_claim(incident.ip_address, jira_key)
+    if not repeats:
+        return
+    if jira_key:
+        add_jira_comment(jira_key, f"⚠️ RECURRING ACTIVITY during triage ({len(repeats)} hits). Last cmd: `{repeats[-1]}`")
+    else:
+        # Triage produced no case; keep the repeats instead of dropping them
+        for command in repeats:
+            defer_alert(incident, command)
+
+def investigate_incident(incident: Incident):
     # 2. ENRICHMENT & PRIVACY
     context = asset_inventory.get_context(incident.ip_address)
     safe_command = scrubber.redact_log(incident.command)
@@ -179,8 +292,10 @@ async def process_pipeline(incident: Incident):
         ai_req = requests.post(AI_ENDPOINT, json={
             "hostname": incident.hostname, "ip_address": incident.ip_address,
             "command": safe_command, "criticality": context['criticality'],
-            "is_business_hours": context['is_business_hours']
-        }, timeout=60)
+            "is_business_hours": context['is_business_hours'],
+            # Headroom so the analyst answers (even degraded) before our timeout fires
+            "budget_seconds": AI_TIMEOUT - 5
+        }, timeout=AI_TIMEOUT)
         
         verdict_report = ai_req.json().get("verdict_report", "Forensic analysis unavailable.")
 
@@ -207,9 +322,10 @@ async def process_pipeline(incident: Incident):
             assignee = ANALYST_ID
 
         # Execute Autonomous Host Containment (Active Defense)
+        # Dispatcher skips contained hosts and coalesces concurrent requests into one bulk call
         if is_malicious:
-            print(f"[🛡️] REMEDIATION: Triggering host isolation for {incident.ip_address}")
-            requests.post(AGENT_ENDPOINT, json={"ip": incident.ip_address}, timeout=5)
+            isolation_status = containment.isolate(incident.ip_address)
+            print(f"[🛡️] REMEDIATION: Host isolation for {incident.ip_address} -> {isolation_status}")
 
         # 5. JIRA RECORD GENERATION
         # Send clean Wiki Markup description to Jira
@@ -239,6 +355,14 @@ async def process_pipeline(incident: Incident):
         print(f"[!] Pipeline Error: {e}")
         return {"status": "Error"}
 
+@app.get("/metrics")
+async def pipeline_metrics():
+    return {
+        "admission": gatekeeper.snapshot(),
+        "deferred_tickets": deferred_tickets.snapshot(),
+        "containment": containment.snapshot()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
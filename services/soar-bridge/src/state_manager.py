@@ -1,10 +1,15 @@
 import json
 import os
 import datetime
+import threading
 
 class StateManager:
     def __init__(self, state_file):
         self.path = state_file
+        # Pipelines run on worker threads; serialize read-modify-write of the state file
+        self._lock = threading.Lock()
+        # ip -> commands from repeat alerts that arrived while the first one was still in triage
+        self._in_flight = {}
 
     def _load(self):
         if not os.path.exists(self.path): return {}
@@ -14,16 +19,46 @@ class StateManager:
         with open(self.path, 'w') as f: json.dump(data, f, indent=4)
 
     def check_duplicate(self, ip):
-        state = self._load()
+        with self._lock:
+            state = self._load()
         if ip in state:
             return state[ip]['ticket'], state[ip]['count']
         return None, 0
 
+    def claim(self, ip, command):
+        """
+        Atomic dedupe check for the triage pipeline. Returns (outcome, ticket, count):
+        - ("TICKET", key, count): the IP already has a case, take the dedupe path
+        - ("IN_FLIGHT", None, repeats): another alert for this IP is mid-triage; this one is recorded as a repeat
+        - ("CLAIMED", None, 0): caller owns triage for the IP and must call release_claim()
+        """
+        with self._lock:
+            state = self._load()
+            if ip in state:
+                return "TICKET", state[ip]['ticket'], state[ip]['count']
+            if ip in self._in_flight:
+                self._in_flight[ip].append(command)
+                return "IN_FLIGHT", None, len(self._in_flight[ip])
+            self._in_flight[ip] = []
+            return "CLAIMED", None, 0
+
+    def release_claim(self, ip, ticket_key=None):
+        """Ends triage for the IP and returns the repeat commands it absorbed (counted onto ticket_key if given)."""
+        with self._lock:
+            repeats = self._in_flight.pop(ip, [])
+            if ticket_key and repeats:
+                self._record(ip, ticket_key, len(repeats))
+        return repeats
+
     def update_incident(self, ip, ticket_key):
+        with self._lock:
+            self._record(ip, ticket_key, 1)
+
+    def _record(self, ip, ticket_key, hits):
         state = self._load()
         count = state.get(ip, {}).get('count', 0)
         state[ip] = {
-            "count": count + 1,
+            "count": count + hits,
             "ticket": ticket_key,
             "last_seen": str(datetime.datetime.now())
         }
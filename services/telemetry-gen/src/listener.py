@@ -16,6 +16,21 @@ async def block_host(data: dict):
     
     return {"status": "SUCCESS", "action": "ISOLATION_APPLIED"}
 
+@app.post("/block/bulk")
+async def block_hosts(data: dict):
+    # Coalesced containment from the SOAR bridge: one call, many hosts
+    target_ips = list(dict.fromkeys(data.get("ips") or []))
+    print(f"\n[!!!] BULK AGENT COMMAND RECEIVED ({len(target_ips)} hosts) [!!!]")
+    results = {}
+    for target_ip in target_ips:
+        print(f"[🛡️] ACTIVE DEFENSE TRIGGERED: ISOLATING HOST {target_ip}")
+        results[target_ip] = "ISOLATION_APPLIED"
+    print(f"[✔] Firewall Rules Applied: DROP ALL TRAFFIC")
+    print(f"[✔] User Sessions Terminated.")
+    print(f"[time]: {datetime.datetime.now()}")
+
+    return {"status": "SUCCESS", "results": results}
+
 if __name__ == "__main__":
     # We run on Port 5000 inside the Telemetry container
     print("[*] FALCON SIMULATION AGENT LISTENING ON PORT 5000...")
@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import hmac
+import marshal
+import asyncio
+import threading
+import traceback
+import tracemalloc
+from collections import Counter, defaultdict
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+# On-demand diagnostics for live FastAPI services.
+# Nothing here runs unless a request asks for it: the stack sampler only exists for the
+# duration of a profile and tracemalloc only traces between POST /memory/start and
+# /memory/stop (or until the start call's TTL runs out).
+# Routes are only mounted when DEBUG_PROFILING_TOKEN is set, and every call must send it
+# back in the X-Debug-Token header.
+
+MAX_PROFILE_SECONDS = 120
+MEMORY_TRACE_TTL_SECONDS = 300
+MAX_MEMORY_TRACE_TTL_SECONDS = 3600
+
+# Leaf frames of a thread parked in a blocking wait (path suffix, function).
+# Worker pools, timers and the event loop's selector sit here most of the time.
+IDLE_LEAF_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    (os.path.join("concurrent", "futures", "thread.py"), "_worker"),
+}
+
+def _is_idle_leaf(frame_key):
+    path, _, func = frame_key
+    return any(func == name and path.endswith(suffix) for suffix, name in IDLE_LEAF_FRAMES)
+
+class StackSampler:
+    """
+    Samples Python thread stacks at a fixed interval (statistical wall-clock profile).
+    Threads whose leaf frame is a known blocking wait are dropped unless include_idle
+    is set, so by default the profile shows where threads are busy.
+    """
+    def __init__(self, interval_seconds, include_idle=False, thread_filter=None):
+        self.interval = interval_seconds
+        self.include_idle = include_idle
+        self.thread_filter = thread_filter
+        self.samples = 0
+        self.idle_dropped = 0
+        self.stacks = Counter()  # (thread_name, frame_key, ...) -> hits
+
+    @staticmethod
+    def _frame_key(frame):
+        code = frame.f_code
+        return (code.co_filename, code.co_firstlineno, code.co_name)
+
+    def run(self, seconds):
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = names.get(ident, f"thread-{ident}")
+                if self.thread_filter and self.thread_filter not in thread_name:
+                    continue
+                if not self.include_idle and _is_idle_leaf(self._frame_key(frame)):
+                    self.idle_dropped += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_key(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[(thread_name,) + tuple(stack)] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack format (flamegraph.pl / speedscope compatible)."""
+        lines = []
+        for key, hits in self.stacks.most_common():
+            thread_name, frames = key[0], key[1:]
+            names = [f"{func} ({os.path.basename(path)}:{line})" for path, line, func in frames]
+            lines.append(";".join([thread_name] + names) + f" {hits}")
+        return "\n".join(lines) + "\n"
+
+    def pstats_dump(self):
+        """
+        Marshalled stats dict loadable by pstats.Stats / snakeviz.
+        Call counts are sample counts; times are samples * interval.
+        """
+        self_hits = Counter()
+        total_hits = Counter()
+        callers = defaultdict(Counter)
+        for key, hits in self.stacks.items():
+            frames = key[1:]
+            if not frames:
+                continue
+            self_hits[frames[-1]] += hits
+            for func in set(frames):
+                total_hits[func] += hits
+            for caller, callee in zip(frames, frames[1:]):
+                callers[callee][caller] += hits
+
+        stats = {}
+        for func, hits in total_hits.items():
+            tt = self_hits[func] * self.interval
+            ct = hits * self.interval
+            caller_stats = {c: (n, n, 0.0, n * self.interval) for c, n in callers[func].items()}
+            stats[func] = (hits, hits, tt, ct, caller_stats)
+        return marshal.dumps(stats)
+
+
+def _format_frame_stack(frame):
+    return [line.rstrip("\n") for line in traceback.format_stack(frame)]
+
+def _format_task_stack(task):
+    summary = traceback.StackSummary.extract((frame, frame.f_lineno) for frame in task.get_stack())
+    return [line.rstrip("\n") for line in summary.format()]
+
+def build_debug_router(token):
+    router = APIRouter(prefix="/debug", tags=["debug"])
+    cpu_lock = threading.Lock()
+    memory_lock = threading.Lock()
+    memory_state = {"baseline": None, "timer": None, "expires_at": None}
+
+    def require_token(x_debug_token: str = Header(default="")):
+        if not hmac.compare_digest(x_debug_token.encode(), token.encode()):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+
+    @router.get("/profile/cpu", dependencies=[Depends(require_token)])
+    async def cpu_profile(seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+                          interval_ms: float = Query(5, ge=1, le=1000),
+                          format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+                          idle: bool = Query(False),
+                          thread: str = Query(None, max_length=100)):
+        """Busy stacks only by default; idle=true keeps blocked threads (full wall-clock view)."""
+        if not cpu_lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A CPU profile is already running")
+        try:
+            sampler = StackSampler(interval_ms / 1000.0, include_idle=idle, thread_filter=thread)
+            await asyncio.to_thread(sampler.run, seconds)
+        finally:
+            cpu_lock.release()
+
+        headers = {
+            "X-Profile-Samples": str(sampler.samples),
+            "X-Profile-Idle-Dropped": str(sampler.idle_dropped)
+        }
+        if format == "pstats":
+            return Response(sampler.pstats_dump(), media_type="application/octet-stream", headers=headers)
+        return PlainTextResponse(sampler.collapsed(), headers=headers)
+
+    def stop_tracing():
+        # Caller holds memory_lock
+        was_tracing = tracemalloc.is_tracing()
+        tracemalloc.stop()
+        if memory_state["timer"] is not None:
+            memory_state["timer"].cancel()
+        memory_state.update(baseline=None, timer=None, expires_at=None)
+        return was_tracing
+
+    def expire_tracing(timer):
+        with memory_lock:
+            # A restart replaces the timer; only the current one may stop tracing
+            if memory_state["timer"] is timer:
+                memory_state["timer"] = None
+                stop_tracing()
+                print("[*] SYSTEM: tracemalloc stopped (debug TTL expired).")
+
+    def expires_in():
+        return max(0.0, round(memory_state["expires_at"] - time.monotonic(), 1))
+
+    @router.post("/memory/start", dependencies=[Depends(require_token)])
+    async def memory_start(ttl_seconds: float = Query(MEMORY_TRACE_TTL_SECONDS, gt=0, le=MAX_MEMORY_TRACE_TTL_SECONDS)):
+        """Starts tracemalloc (or extends it) and stops it automatically after ttl_seconds."""
+        with memory_lock:
+            already_tracing = tracemalloc.is_tracing()
+            if not already_tracing:
+                tracemalloc.start(25)
+                memory_state["baseline"] = tracemalloc.take_snapshot()
+            if memory_state["timer"] is not None:
+                memory_state["timer"].cancel()
+            timer = threading.Timer(ttl_seconds, lambda: expire_tracing(timer))
+            timer.daemon = True
+            memory_state.update(timer=timer, expires_at=time.monotonic() + ttl_seconds)
+            timer.start()
+            return {
+                "status": "tracing_extended" if already_tracing else "tracing_started",
+                "expires_in_seconds": expires_in()
+            }
+
+    @router.get("/memory", dependencies=[Depends(require_token)])
+    async def memory_snapshot(top: int = Query(25, ge=1, le=500)):
+        """Snapshot of the traced heap, diffed against the previous snapshot (or the start)."""
+        with memory_lock:
+            if not tracemalloc.is_tracing():
+                raise HTTPException(status_code=409, detail="tracemalloc is not running. POST /debug/memory/start first.")
+
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                "status": "tracing",
+                "expires_in_seconds": expires_in() if memory_state["expires_at"] else None,
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "top": [
+                    {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ]
+            }
+            if memory_state["baseline"] is not None:
+                result["growth"] = [
+                    {"location": str(diff.traceback[0]), "size_diff_bytes": diff.size_diff,
+                     "size_bytes": diff.size, "count_diff": diff.count_diff}
+                    for diff in snapshot.compare_to(memory_state["baseline"], "lineno")[:top]
+                ]
+            memory_state["baseline"] = snapshot
+            return result
+
+    @router.post("/memory/stop", dependencies=[Depends(require_token)])
+    async def memory_stop():
+        with memory_lock:
+            return {"status": "stopped" if stop_tracing() else "not_tracing"}
+
+    @router.get("/stacks", dependencies=[Depends(require_token)])
+    async def dump_stacks():
+        names = {t.ident: t.name for t in threading.enumerate()}
+        threads = [
+            {"thread": names.get(ident, f"thread-{ident}"), "ident": ident, "stack": _format_frame_stack(frame)}
+            for ident, frame in sys._current_frames().items()
+        ]
+        tasks = []
+        for task in asyncio.all_tasks():
+            tasks.append({
+                "task": task.get_name(),
+                "coro": getattr(task.get_coro(), "__qualname__", repr(task.get_coro())),
+                "done": task.done(),
+                "stack": _format_task_stack(task)
+            })
+        return {"threads": threads, "asyncio_tasks": tasks}
+
+    return router
+
+def install_debug_routes(app):
+    """Mounts /debug/* on the app when DEBUG_PROFILING_TOKEN is configured."""
+    token = os.getenv("DEBUG_PROFILING_TOKEN")
+    if not token:
+        return False
+    app.include_router(build_debug_router(token))
+    print("[*] SYSTEM: Debug profiling endpoints enabled under /debug (token required).")
+    return True
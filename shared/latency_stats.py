@@ -0,0 +1,9 @@
+import math
+
+def percentile(samples, pct):
+    """Nearest-rank percentile over a list of floats (None when empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
@@ -1,5 +1,8 @@
 import re
 
+# Prefix that replaces the first three octets of every redacted IP (192.168.1.102 -> INTERNAL_NET.102)
+INTERNAL_NET_MARKER = "INTERNAL_NET."
+
 class PrivacyEngine:
     def __init__(self):
         # Patterns for Email, Internal IP structure, and specific usernames
@@ -19,7 +22,7 @@ class PrivacyEngine:
 
         # 2. Redact IPs (Masking prefix, keeping end for log correlation)
         # e.g., 192.168.1.102 -> INTERNAL_NET.102
-        scrubbed = re.sub(self.ip_pattern, r"INTERNAL_NET.\1", scrubbed)
+        scrubbed = re.sub(self.ip_pattern, INTERNAL_NET_MARKER + r"\1", scrubbed)
 
         # 3. Security context cleaning (Removing known sensitive paths if necessary)
         # This keeps the behavior but hides the specific server/user name